@@ -330,13 +330,7 @@ public static class ExtractionTools
         return k is "the" or "and" or "else" or "null" or "true" or "false" or "class" or "public" or "private" or "protected" or "static" or "void" or "int" or "string" or "return" or "if" or "for" or "while" or "this" or "var" or "let" or "const" or "function";
     }
 
-    public static string Sha256(string s)
-    {
-        using var sha = SHA256.Create();
-        var bytes = Encoding.UTF8.GetBytes(s);
-        var hash = sha.ComputeHash(bytes);
-        var sb = new StringBuilder(hash.Length * 2);
-        foreach (var b in hash) sb.Append(b.ToString("x2"));
-        return sb.ToString();
-    }
+    public static string Sha256(string s) => Sha256(Encoding.UTF8.GetBytes(s));
+
+    public static string Sha256(ReadOnlySpan<byte> bytes) => Convert.ToHexString(SHA256.HashData(bytes)).ToLowerInvariant();
 }
\ No newline at end of file
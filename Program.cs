@@ -154,11 +154,27 @@ namespace ScriptRunner
                     IndexThreads = config.Threads
                 });
 
-                Console.WriteLine("Loading corpus...");
-                rag.LoadCorpus();
-                
-                Console.WriteLine("Building index...");
-                rag.BuildIndex();
+                if (rag.TryLoadIndex())
+                {
+                    Console.WriteLine("Loaded cached index");
+                }
+                else
+                {
+                    Console.WriteLine("Loading corpus...");
+                    rag.LoadCorpus();
+                    
+                    Console.WriteLine("Building index...");
+                    rag.BuildIndex();
+                    try
+                    {
+                        rag.SaveIndex();
+                    }
+                    catch (Exception ex) when (ex is not OperationCanceledException)
+                    {
+                        // The cache only saves the next run a rebuild; answer the query regardless
+                        Console.Error.WriteLine($"Warning: could not save index cache: {ex.Message}");
+                    }
+                }
                 
                 Console.WriteLine($"Retrieving relevant documents for: {query}");
                 var hits = rag.Retrieve(query, k: config.RetrievalTopK);
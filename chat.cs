@@ -2,11 +2,13 @@
 using System;
 using System.Collections.Generic;
 using System.Net.Http;
+using System.Net.Http.Json;
 using System.Text;
 using System.Text.Json;
 using System.Text.Json.Serialization;
 using System.Threading;
 using System.Threading.Tasks;
+using OllamaHttpLib;
 
 namespace OllamaChatLib;
 
@@ -25,7 +27,7 @@ public sealed class OllamaChatClient : IAsyncDisposable
     public OllamaChatClient(ChatOptions opts)
     {
         _opts = opts;
-        _http = new HttpClient { Timeout = _opts.Timeout };
+        _http = new HttpClient(OllamaHttp.SharedHandler, disposeHandler: false) { Timeout = _opts.Timeout };
     }
 
     /// <summary>
@@ -49,14 +51,13 @@ public sealed class OllamaChatClient : IAsyncDisposable
 
         using var req = new HttpRequestMessage(HttpMethod.Post, url)
         {
-            Content = new StringContent(JsonSerializer.Serialize(reqBody), Encoding.UTF8, "application/json")
+            Content = JsonContent.Create(reqBody)
         };
 
         using var resp = await _http.SendAsync(req, ct);
         resp.EnsureSuccessStatusCode();
 
-        var json = await resp.Content.ReadAsStringAsync(ct);
-        var obj = JsonSerializer.Deserialize<ChatResponse>(json) ?? new ChatResponse();
+        var obj = await resp.Content.ReadFromJsonAsync<ChatResponse>(ct) ?? new ChatResponse();
         var text = obj.message?.Content ?? obj.response ?? "";
         return text.Trim();
     }
@@ -1,9 +1,13 @@
 // extract.cs
 using System;
+using System.Buffers;
 using System.Collections.Concurrent;
+using System.Collections.Frozen;
 using System.Collections.Generic;
 using System.IO;
+using System.IO.Enumeration;
 using System.Linq;
+using System.Runtime.CompilerServices;
 using System.Security.Cryptography;
 using System.Text;
 using System.Text.Json;
@@ -27,13 +31,19 @@ public sealed class CodeExtractor
     readonly ExtractOptions _opts;
     readonly int _scanThreads;
 
+    // Corpus files are written/read with one large buffer so each record doesn't cost a syscall
+    const int CorpusBufferSize = 1 << 20;
+    const int PipelineDepth = 64;
+
     public CodeExtractor(ExtractOptions opts)
     {
         _opts = opts;
         _scanThreads = Math.Max(1, opts.Threads);
     }
 
-    static readonly HashSet<string> AllowedExts = new(StringComparer.OrdinalIgnoreCase)
+    // Allowed file extensions. Only the source of AllowedExtKeys: the filter never looks these
+    // strings up, so there is a single extension check.
+    static readonly string[] AllowedExts =
     {
         ".py",".ipynb",".js",".mjs",".cjs",".ts",".tsx",".jsx",".vue",".svelte",".java",".kt",".kts",".scala",".go",".rs",
         ".c",".h",".cpp",".cc",".cxx",".hpp",".hh",".m",".mm",".cs",".fs",".fsx",".php",".rb",".swift",".lua",".pl",".pm",".r",
@@ -43,7 +53,12 @@ public sealed class CodeExtractor
         ".md",".markdown",".rst",".adoc",".txt",".csv",".tsv",".log",".org",
     };
 
-    static readonly Dictionary<string,string> SpecialBasenames = new(StringComparer.Ordinal)
+    // Frozen lookups: built once at type init and optimized for the read-only hot filter loop.
+    // AllowedExtKeys holds the extensions packed into integers (see PackExtension), so the
+    // per-file check is one probe without cutting or case-folding a substring.
+    static readonly FrozenSet<UInt128> AllowedExtKeys = AllowedExts.Select(e => PackExtension(e.AsSpan(1))).ToFrozenSet();
+
+    static readonly FrozenDictionary<string,string> SpecialBasenames = new Dictionary<string,string>
     {
         ["Dockerfile"]="dockerfile",["Makefile"]="make",["CMakeLists.txt"]="cmake",
         ["BUILD"]="bazel",["WORKSPACE"]="bazel",["Podfile"]="cocoapods",["Gemfile"]="ruby-gems",
@@ -53,15 +68,26 @@ public sealed class CodeExtractor
         ["composer.json"]="composer",["composer.lock"]="composer-lock",["pom.xml"]="maven",
         ["build.gradle.kts"]="gradle-kts",["build.gradle"]="gradle",
         [".gitignore"]="git",[ ".gitattributes"]="git",[ ".editorconfig"]="editor",
-    };
+    }.ToFrozenDictionary(StringComparer.Ordinal);
 
-    static readonly HashSet<string> IgnoreDirs = new(StringComparer.OrdinalIgnoreCase)
+    static readonly FrozenSet<string> IgnoreDirs = new[]
     {
         ".git",".hg",".svn",".bzr","node_modules","dist","build","out","target",
         ".idea",".vscode",".vs","__pycache__",".venv","venv",".mypy_cache",".pytest_cache",".gradle",".next",".nuxt",".parcel-cache"
-    };
+    }.ToFrozenSet(StringComparer.OrdinalIgnoreCase);
 
     public void Extract(CancellationToken ct = default)
+    {
+        if (!Extract(ct, reuseExisting: true))
+        {
+            Console.WriteLine("Previous corpus could not be read; rebuilding it from scratch");
+            Extract(ct, reuseExisting: false);
+        }
+    }
+
+    // Returns false, having written nothing, when the previous corpus failed to read while its
+    // unchanged entries were being copied; the caller then rebuilds without it.
+    bool Extract(CancellationToken ct, bool reuseExisting)
     {
         var root = Path.GetFullPath(_opts.ProjectRoot);
         if (!Directory.Exists(root)) throw new DirectoryNotFoundException(root);
@@ -69,44 +95,38 @@ public sealed class CodeExtractor
         Directory.CreateDirectory(Path.GetDirectoryName(Path.GetFullPath(_opts.OutPath))!);
         
         // Load existing corpus to check for file hashes
-        var existingEntries = LoadExistingCorpus();
+        var existingEntries = reuseExisting ? LoadExistingCorpus() : new Dictionary<string, string>(StringComparer.Ordinal);
         Console.WriteLine($"Loaded {existingEntries.Count} existing entries from corpus");
         
-        // Always write tree manifest
-        var tempTreePath = _opts.OutPath + ".tree.tmp";
-        using (var init = new FileStream(tempTreePath, FileMode.Create, FileAccess.Write, FileShare.Read))
-        using (var w = new StreamWriter(init, new UTF8Encoding(false)))
+        // A single walk feeds both the tree manifest and the candidate file list
+        var treeLines = new List<string> { Path.GetFileName(root.TrimEnd(Path.DirectorySeparatorChar, Path.AltDirectorySeparatorChar)) };
+        // Scan paths are full paths under root, so the relative path is a plain slice
+        var relStart = Path.EndsInDirectorySeparator(root) ? root.Length : root.Length + 1;
+        var dfsFiles = new List<(string path, string rel, long size)>();
+        foreach (var (path, name, size, depth, isDir) in Scan(root, _scanThreads))
         {
-            WriteTreeManifest(w, root);
-            w.Flush();
+            treeLines.Add(isDir
+                ? new string(' ', Math.Max(0, (depth - 1) * 4)) + "└── " + name
+                : new string(' ', depth * 4) + "├── " + name);
+            if (!isDir && IsAllowedFile(name)) dfsFiles.Add((path, path.Substring(relStart), size));
         }
-
-        var dfsFiles = EnumerateFilesDFS(root).Where(IsAllowedFile).ToList();
         var totalFiles = dfsFiles.Count;
         Console.WriteLine($"Found {totalFiles} files to scan");
         
-        // Calculate total size and filter files > MaxBytes
-        var fileInfos = new List<(string path, long size)>();
+        // Calculate total size and filter files > MaxBytes (size comes from the scan, no second stat)
+        var fileInfos = new List<(string path, string rel, long size)>();
         var skippedTooLarge = 0;
         long totalBytes = 0;
         
-        foreach (var file in dfsFiles)
+        foreach (var (file, rel, size) in dfsFiles)
         {
-            try
+            if (size > _opts.MaxBytes)
             {
-                var fi = new FileInfo(file);
-                if (fi.Length > _opts.MaxBytes)
-                {
-                    skippedTooLarge++;
-                    continue;
-                }
-                fileInfos.Add((file, fi.Length));
-                totalBytes += fi.Length;
-            }
-            catch
-            {
-                // Skip files we can't access
+                skippedTooLarge++;
+                continue;
             }
+            fileInfos.Add((file, rel, size));
+            totalBytes += size;
         }
         
         if (skippedTooLarge > 0)
@@ -114,25 +134,30 @@ public sealed class CodeExtractor
             Console.WriteLine($"Skipped {skippedTooLarge} files larger than {_opts.MaxBytes / (1024 * 1024)} MB");
         }
         
-        // Determine which files need processing based on hash
-        var filesToProcess = new List<(string path, long size)>();
+        // Determine which files need processing based on hash. Hashing is pure I/O + SHA, so it
+        // fans out across the scan threads; the comparison below stays serial to keep DFS order.
+        var parallel = new ParallelOptions { MaxDegreeOfParallelism = _scanThreads, CancellationToken = ct };
+        var fileHashes = new string[fileInfos.Count];
+        Parallel.For(0, fileInfos.Count, parallel, k => fileHashes[k] = ComputeFileHash(fileInfos[k].path, fileInfos[k].size));
+
+        var filesToProcess = new List<(string path, string rel, long size)>();
+        var processedFileIds = new HashSet<string>(StringComparer.Ordinal);
         var skippedUnchanged = 0;
         long bytesToProcess = 0;
         
-        foreach (var (file, size) in fileInfos)
+        for (var k = 0; k < fileInfos.Count; k++)
         {
-            ct.ThrowIfCancellationRequested();
-            var fileHash = ComputeFileHash(file);
-            var rel = Path.GetRelativePath(root, file);
+            var (file, rel, size) = fileInfos[k];
             var fileId = BuildIdForFile(rel);
             
-            if (existingEntries.TryGetValue(fileId, out var existing) && existing.hash == fileHash)
+            if (existingEntries.TryGetValue(fileId, out var existing) && existing == fileHashes[k])
             {
                 skippedUnchanged++;
             }
             else
             {
-                filesToProcess.Add((file, size));
+                filesToProcess.Add((file, rel, size));
+                processedFileIds.Add(fileId);
                 bytesToProcess += size;
             }
         }
@@ -143,158 +168,194 @@ public sealed class CodeExtractor
         if (filesToProcess.Count == 0 && skippedUnchanged == 0)
         {
             Console.WriteLine("No files to process");
-            return;
+            return true;
         }
         
-        // Process changed files with progress tracking
-        var newEntries = new ConcurrentDictionary<string, List<string>>(StringComparer.Ordinal);
+        // Stream the new corpus into a temp file next to the old one: tree, then unchanged entries
+        // copied line by line from the old corpus, then new entries in path order as the workers
+        // finish them. Only in-flight files are held in memory, and the old corpus stays intact
+        // until the final rename.
+        var finalPath = _opts.OutPath;
+        var tempPath = _opts.OutPath + ".tmp";
         var processedCount = 0;
         long processedBytes = 0;
+        long lastReportTicks = 0;
+        var lastReportedCount = 0;
+        var progressGate = new object();
         var startTime = DateTimeOffset.UtcNow;
-        var i = 0;
-
-        while (i < filesToProcess.Count)
-        {
-            ct.ThrowIfCancellationRequested();
-            var round = filesToProcess.Skip(i).Take(_scanThreads).ToList();
-
-            Parallel.ForEach(
-                source: round,
-                new ParallelOptions { MaxDegreeOfParallelism = _scanThreads, CancellationToken = ct },
-                item =>
-                {
-                    var (path, size) = item;
-                    try
-                    {
-                        var entryLines = ProcessFile(root, path).ToList();
-                        if (entryLines.Count > 0)
-                        {
-                            newEntries[path] = entryLines;
-                        }
-                    }
-                    catch (Exception ex)
-                    {
-                        Console.Error.WriteLine($"Error processing {path}: {ex.Message}");
-                    }
-                });
-
-            // Update progress
-            foreach (var (path, size) in round)
-            {
-                processedBytes += size;
-            }
-            processedCount += round.Count;
-            
-            var percentage = (processedCount * 100.0) / filesToProcess.Count;
-            var elapsed = DateTimeOffset.UtcNow - startTime;
-            var bytesPerSecond = processedBytes / elapsed.TotalSeconds;
-            var remainingBytes = bytesToProcess - processedBytes;
-            var estimatedSecondsRemaining = remainingBytes / Math.Max(bytesPerSecond, 1);
-            var eta = TimeSpan.FromSeconds(estimatedSecondsRemaining);
-            
-            Console.Write($"\rProgress: {processedCount}/{filesToProcess.Count} files ({percentage:F1}%) | " +
-                         $"{FormatBytes(processedBytes)}/{FormatBytes(bytesToProcess)} | " +
-                         $"ETA: {FormatTimeSpan(eta)}      ");
-
-            i += round.Count;
-        }
         
-        Console.WriteLine();
-        
-        // Merge: write tree, then existing (unchanged) entries, then new entries
-        var finalPath = _opts.OutPath;
-        var backupPath = _opts.OutPath + ".backup";
+        // Changed files are processed by the workers while this thread writes the manifest and
+        // copies the unchanged entries. Their chunks are handed over through a queue of at most
+        // PipelineDepth entries; that bounds only the handoff, since the ordered PLINQ merge keeps
+        // its own per-partition buffers on top.
+        using var pipelineCts = CancellationTokenSource.CreateLinkedTokenSource(ct);
+        using var pending = new BlockingCollection<byte[]>(PipelineDepth);
+        var newEntries = filesToProcess
+            .OrderBy(f => f.path)
+            .AsParallel()
+            .AsOrdered()
+            .WithDegreeOfParallelism(_scanThreads)
+            .WithCancellation(pipelineCts.Token)
+            .WithMergeOptions(ParallelMergeOptions.NotBuffered)
+            .Select(item =>
+            {
+                var (path, rel, size) = item;
+                var chunk = Array.Empty<byte>();
+                try
+                {
+                    chunk = ProcessFile(root, path, rel, size);
+                }
+                catch (Exception ex)
+                {
+                    Console.Error.WriteLine($"Error processing {path}: {ex.Message}");
+                }
+                ReportProgress(size);
+                return chunk;
+            });
         
-        if (File.Exists(finalPath))
-        {
-            File.Copy(finalPath, backupPath, overwrite: true);
-        }
+        Task? producer = null;
+        var oldCorpusUnreadable = false;
         
         try
         {
-            using (var fs = new FileStream(finalPath, FileMode.Create, FileAccess.Write, FileShare.Read))
-            using (var w = new StreamWriter(fs, new UTF8Encoding(false)))
+            producer = Task.Run(() =>
             {
-                // Write tree manifest
-                var treeContent = File.ReadAllText(tempTreePath);
-                w.Write(treeContent);
-                
-                // Get all file IDs that were processed
-                var processedFileIds = new HashSet<string>(StringComparer.Ordinal);
-                foreach (var (file, _) in filesToProcess)
+                try
                 {
-                    var rel = Path.GetRelativePath(root, file);
-                    var fileId = BuildIdForFile(rel);
-                    processedFileIds.Add(fileId);
+                    foreach (var chunk in newEntries)
+                    {
+                        pending.Add(chunk, pipelineCts.Token);
+                    }
+                }
+                finally
+                {
+                    pending.CompleteAdding();
                 }
+            });
+            
+            using (var w = new FileStream(tempPath, FileMode.Create, FileAccess.Write, FileShare.Read, CorpusBufferSize))
+            {
+                // Always write tree manifest
+                WriteTreeManifest(w, root, treeLines);
                 
-                // Write unchanged entries from existing corpus
-                foreach (var kvp in existingEntries)
+                // Write unchanged entries from existing corpus. A read failure here leaves files
+                // counted as unchanged without their entries, so the whole pass is abandoned.
+                using (var oldEntries = existingEntries.Count > 0
+                    ? ReadCorpusEntries(finalPath).GetEnumerator()
+                    : Enumerable.Empty<(string id, string hash, string json)>().GetEnumerator())
                 {
-                    var entryId = kvp.Key;
-                    var entry = kvp.Value;
-                    
-                    var isFileEntry = entryId.EndsWith(".file");
-                    var isClassEntry = entryId.EndsWith(".class");
-                    var isFunctionEntry = !isFileEntry && !isClassEntry && entryId != "__TREE__";
-                    
-                    if (isFileEntry && processedFileIds.Contains(entryId))
+                    while (true)
                     {
-                        continue;
-                    }
-                    
-                    if (isClassEntry || isFunctionEntry)
-                    {
-                        var belongsToReprocessedFile = false;
-                        foreach (var fileId in processedFileIds)
+                        try
                         {
-                            var filePrefix = fileId.Substring(0, fileId.Length - 5);
-                            if (entryId.StartsWith(filePrefix + "."))
-                            {
-                                belongsToReprocessedFile = true;
-                                break;
-                            }
+                            if (!oldEntries.MoveNext()) break;
+                        }
+                        catch (Exception ex) when (ex is not OperationCanceledException)
+                        {
+                            Console.Error.WriteLine($"Error reading previous corpus: {ex.Message}");
+                            oldCorpusUnreadable = true;
+                            break;
                         }
+                        var (entryId, _, json) = oldEntries.Current;
+                        var isFileEntry = entryId.EndsWith(".file");
+                        var isClassEntry = entryId.EndsWith(".class");
+                        var isFunctionEntry = !isFileEntry && !isClassEntry && entryId != "__TREE__";
                         
-                        if (belongsToReprocessedFile)
+                        if (isFileEntry && processedFileIds.Contains(entryId))
                         {
                             continue;
                         }
+                        
+                        if (isClassEntry || isFunctionEntry)
+                        {
+                            var belongsToReprocessedFile = false;
+                            foreach (var fileId in processedFileIds)
+                            {
+                                var filePrefix = fileId.Substring(0, fileId.Length - 5);
+                                if (entryId.StartsWith(filePrefix + "."))
+                                {
+                                    belongsToReprocessedFile = true;
+                                    break;
+                                }
+                            }
+                        
+                            if (belongsToReprocessedFile)
+                            {
+                                continue;
+                            }
+                        }
+                        
+                        // Only entries seen by LoadExistingCorpus, and each id once
+                        if (!existingEntries.Remove(entryId)) continue;
+                        WriteJsonLine(w, Encoding.UTF8.GetBytes(json));
                     }
-                    
-                    w.WriteLine(entry.json);
                 }
                 
-                // Write new/updated entries
-                foreach (var kvp in newEntries.OrderBy(k => k.Key))
+                if (!oldCorpusUnreadable)
                 {
-                    foreach (var line in kvp.Value)
+                    // New/updated entries, in path order, as the workers hand them over
+                    foreach (var chunk in pending.GetConsumingEnumerable(pipelineCts.Token))
                     {
-                        w.WriteLine(line);
+                        w.Write(chunk);
                     }
+                    producer.GetAwaiter().GetResult();
                 }
             }
             
-            // Clean up
-            File.Delete(tempTreePath);
-            if (File.Exists(backupPath))
+            if (oldCorpusUnreadable)
             {
-                File.Delete(backupPath);
+                pipelineCts.Cancel();
+                try { producer.Wait(); } catch (AggregateException) { }
+                File.Delete(tempPath);
+                Console.WriteLine();
+                return false;
             }
             
+            Console.WriteLine();
+            File.Move(tempPath, finalPath, overwrite: true);
+            
             var totalTime = DateTimeOffset.UtcNow - startTime;
             Console.WriteLine($"Extraction complete! Processed {filesToProcess.Count} files, kept {skippedUnchanged} unchanged in {FormatTimeSpan(totalTime)}");
+            return true;
         }
         catch (Exception ex)
         {
             Console.Error.WriteLine($"Error writing corpus: {ex.Message}");
-            if (File.Exists(backupPath))
+            pipelineCts.Cancel();
+            try { producer?.Wait(); } catch (AggregateException) { }
+            if (File.Exists(tempPath))
             {
-                File.Copy(backupPath, finalPath, overwrite: true);
-                Console.WriteLine("Restored from backup");
+                File.Delete(tempPath);
+                Console.WriteLine("Kept previous corpus");
             }
             throw;
         }
+        
+        void ReportProgress(long size)
+        {
+            var done = Interlocked.Increment(ref processedCount);
+            var doneBytes = Interlocked.Add(ref processedBytes, size);
+            var now = Environment.TickCount64;
+            if (done != filesToProcess.Count && now - Interlocked.Read(ref lastReportTicks) < 250) return;
+
+            lock (progressGate)
+            {
+                // A thread holding an earlier count may get here after a later one; never go backwards
+                if (done < lastReportedCount) return;
+                lastReportedCount = done;
+                Interlocked.Exchange(ref lastReportTicks, now);
+                var percentage = (done * 100.0) / filesToProcess.Count;
+                var elapsed = DateTimeOffset.UtcNow - startTime;
+                var bytesPerSecond = doneBytes / Math.Max(elapsed.TotalSeconds, 1e-3);
+                var remainingBytes = bytesToProcess - doneBytes;
+                var estimatedSecondsRemaining = remainingBytes / Math.Max(bytesPerSecond, 1);
+                var eta = TimeSpan.FromSeconds(estimatedSecondsRemaining);
+                
+                Console.Write($"\rProgress: {done}/{filesToProcess.Count} files ({percentage:F1}%) | " +
+                             $"{FormatBytes(doneBytes)}/{FormatBytes(bytesToProcess)} | " +
+                             $"ETA: {FormatTimeSpan(eta)}      ");
+            }
+        }
     }
     
     static string FormatBytes(long bytes)
@@ -319,207 +380,346 @@ public sealed class CodeExtractor
         return $"{ts.TotalHours:F1}h";
     }
     
-    Dictionary<string, (string hash, string json)> LoadExistingCorpus()
+    Dictionary<string, string> LoadExistingCorpus()
     {
-        var entries = new Dictionary<string, (string hash, string json)>(StringComparer.Ordinal);
+        var entries = new Dictionary<string, string>(StringComparer.Ordinal);
         
-        if (!File.Exists(_opts.OutPath))
+        try
+        {
+            foreach (var (id, hash, _) in ReadCorpusEntries(_opts.OutPath))
+            {
+                entries[id] = hash;
+            }
+        }
+        catch
         {
-            return entries;
+            // If we can't read the corpus, treat it as empty; a partial read would mark files
+            // unchanged whose entries may not be there to copy
+            entries.Clear();
         }
         
+        return entries;
+    }
+    
+    // Streams (id, hash, raw line) for every well-formed entry; the raw line is copied verbatim
+    // into the next corpus so unchanged entries are never re-serialized or kept in memory.
+    static IEnumerable<(string id, string hash, string json)> ReadCorpusEntries(string path)
+    {
+        if (!File.Exists(path)) yield break;
+        
+        using var fs = new FileStream(path, FileMode.Open, FileAccess.Read, FileShare.Read, CorpusBufferSize, FileOptions.SequentialScan);
+        using var sr = new StreamReader(fs, new UTF8Encoding(false), false, CorpusBufferSize);
+        string? line;
+        while ((line = sr.ReadLine()) != null)
+        {
+            if (line.Length == 0) continue;
+            
+            string? id = null, hash = null;
+            try
+            {
+                var key = JsonSerializer.Deserialize<CorpusKey>(line);
+                id = key?.id;
+                hash = key?.hash;
+            }
+            catch
+            {
+                // Skip malformed entries
+            }
+            
+            if (id != null && hash != null)
+            {
+                yield return (id, hash, line);
+            }
+        }
+    }
+    
+    static string ComputeFileHash(string filePath, long size)
+    {
         try
         {
-            using var fs = File.OpenRead(_opts.OutPath);
-            using var sr = new StreamReader(fs, new UTF8Encoding(false));
-            string? line;
-            while ((line = sr.ReadLine()) != null)
+            // A file that grew since the scan is re-read once at its new length; if it is still
+            // growing, the empty hash sends it on to ReadTextFile, which skips it with a warning
+            for (var attempt = 0; ; attempt++)
             {
-                if (line.Length == 0) continue;
-                
+                var buffer = ArrayPool<byte>.Shared.Rent((int)size);
                 try
                 {
-                    using var jd = JsonDocument.Parse(line);
-                    var root = jd.RootElement;
-                    
-                    if (!root.TryGetProperty("id", out var idProp)) continue;
-                    if (!root.TryGetProperty("hash", out var hashProp)) continue;
-                    
-                    var id = idProp.GetString();
-                    var hash = hashProp.GetString();
-                    
-                    if (id != null && hash != null)
+                    if (TryReadFileInto(filePath, buffer.AsSpan(0, (int)size), out var read, out var length))
                     {
-                        entries[id] = (hash, line);
+                        return ExtractionTools.Sha256(buffer.AsSpan(0, read));
                     }
+                    if (attempt > 0) return "";
+                    size = length;
                 }
-                catch
+                finally
                 {
-                    // Skip malformed entries
+                    ArrayPool<byte>.Shared.Return(buffer);
                 }
             }
         }
         catch
         {
-            // If we can't read the corpus, just return empty
+            // If we can't read the file, return empty hash so it gets processed
+            return "";
+        }
+    }
+
+    // Whole-file read with the size already known from the scan: one open and, for files that
+    // fit, a single positional read straight into the caller's buffer. No FileStream and no
+    // internal buffer copy. A full buffer is followed by a one-byte probe; if the file has
+    // grown since the scan, this returns false with its current length in `length`.
+    static bool TryReadFileInto(string file, Span<byte> buffer, out int read, out long length)
+    {
+        using var handle = File.OpenHandle(file, FileMode.Open, FileAccess.Read, FileShare.Read, FileOptions.SequentialScan);
+        read = 0;
+        length = 0;
+        while (read < buffer.Length)
+        {
+            var n = RandomAccess.Read(handle, buffer[read..], read);
+            if (n == 0) return true; // shrank since the scan
+            read += n;
         }
-        
-        return entries;
+        Span<byte> probe = stackalloc byte[1];
+        if (RandomAccess.Read(handle, probe, read) == 0) return true;
+        length = RandomAccess.GetLength(handle);
+        return false;
     }
-    
-    static string ComputeFileHash(string filePath)
+
+    static readonly UTF8Encoding StrictUtf8 = new(encoderShouldEmitUTF8Identifier: false, throwOnInvalidBytes: true);
+
+    // Reads the file once and hashes the raw bytes, so the record hash matches ComputeFileHash
+    // without re-encoding the decoded text back to UTF-8. The size comes from the scan, so
+    // oversized files are rejected before they are opened and the read needs no extra stat.
+    static (string Content, int Size, string Hash)? ReadTextFile(string file, long size, long maxBytes)
     {
+        byte[] bytes;
         try
         {
-            using var sha = SHA256.Create();
-            using var fs = File.OpenRead(filePath);
-            var hash = sha.ComputeHash(fs);
-            var sb = new StringBuilder(hash.Length * 2);
-            foreach (var b in hash) sb.Append(b.ToString("x2"));
-            return sb.ToString();
+            // Same one retry as ComputeFileHash; a file that keeps growing is skipped rather
+            // than indexed as a truncated prefix
+            for (var attempt = 0; ; attempt++)
+            {
+                if (size > maxBytes) return null;
+                bytes = new byte[size];
+                if (TryReadFileInto(file, bytes, out var read, out var length))
+                {
+                    if (read < bytes.Length) Array.Resize(ref bytes, read);
+                    break;
+                }
+                if (attempt > 0)
+                {
+                    Console.Error.WriteLine($"Skipping {file}: still changing after the scan");
+                    return null;
+                }
+                size = length;
+            }
         }
         catch
         {
-            // If we can't read the file, return empty hash so it gets processed
-            return "";
+            return null;
+        }
+
+        return (DecodeText(bytes), bytes.Length, ExtractionTools.Sha256(bytes));
+    }
+
+    // The BOM decides the encoding up front; only BOM-less files go through the strict UTF-8
+    // attempt with a Latin-1 fallback.
+    static string DecodeText(ReadOnlySpan<byte> bytes)
+    {
+        if (bytes.StartsWith((ReadOnlySpan<byte>)[0xEF, 0xBB, 0xBF])) return Encoding.UTF8.GetString(bytes[3..]);
+        if (bytes.StartsWith((ReadOnlySpan<byte>)[0xFF, 0xFE])) return Encoding.Unicode.GetString(bytes[2..]);
+        if (bytes.StartsWith((ReadOnlySpan<byte>)[0xFE, 0xFF])) return Encoding.BigEndianUnicode.GetString(bytes[2..]);
+
+        try
+        {
+            return StrictUtf8.GetString(bytes);
+        }
+        catch (DecoderFallbackException)
+        {
+            return Encoding.Latin1.GetString(bytes);
         }
     }
 
-    static IEnumerable<string> EnumerateFilesDFS(string root)
+    static readonly EnumerationOptions ScanOptions = new()
     {
-        var stack = new Stack<string>();
-        stack.Push(root);
+        RecurseSubdirectories = false,
+        IgnoreInaccessible = true,
+        AttributesToSkip = 0,
+        ReturnSpecialDirectories = false,
+    };
+
+    // One directory listing per directory: FileSystemEntry carries the entry type and size from
+    // the enumeration itself, so we never build FileInfo objects or list a directory twice.
+    // Listing is metadata-bound, so the next `lookahead` directories in DFS order are listed on
+    // the thread pool while the current one is consumed; output order is unchanged.
+    static IEnumerable<(string path, string name, long size, int depth, bool isDir)> Scan(string root, int lookahead)
+    {
+        var stack = new List<(string path, string name, int depth, Task<DirListing>? listing)>();
+        stack.Add((root, Path.GetFileName(root), 0, null));
         while (stack.Count > 0)
         {
-            var cur = stack.Pop();
-            IEnumerable<string> files;
-            try { files = Directory.EnumerateFiles(cur); } catch { files = Array.Empty<string>(); }
-            foreach (var f in files) yield return f;
-
-            IEnumerable<string> dirs;
-            try { dirs = Directory.EnumerateDirectories(cur); } catch { dirs = Array.Empty<string>(); }
-            foreach (var d in dirs.OrderByDescending(s => s, StringComparer.Ordinal))
+            var (cur, curName, depth, pending) = stack[^1];
+            stack.RemoveAt(stack.Count - 1);
+            var (files, dirs) = pending?.Result ?? ListDirectory(cur);
+
+            dirs.Sort((a, b) => StringComparer.Ordinal.Compare(b.path, a.path));
+            foreach (var (path, name) in dirs) stack.Add((path, name, depth + 1, null));
+            for (int k = stack.Count - 1; k >= Math.Max(0, stack.Count - lookahead); k--)
             {
-                var name = Path.GetFileName(d);
-                if (IgnoreDirs.Contains(name)) continue;
-                stack.Push(d);
+                var next = stack[k];
+                if (next.listing != null) continue;
+                var nextPath = next.path;
+                stack[k] = (next.path, next.name, next.depth, Task.Run(() => ListDirectory(nextPath)));
             }
+
+            if (depth > 0) yield return (cur, curName, 0, depth, true);
+            foreach (var (path, name, size) in files) yield return (path, name, size, depth, false);
         }
     }
 
-    static void WriteTreeManifest(StreamWriter w, string root)
+    readonly record struct DirListing(List<(string path, string name, long size)> Files, List<(string path, string name)> Dirs);
+
+    static DirListing ListDirectory(string dir)
     {
-        var lines = new List<string> { Path.GetFileName(root.TrimEnd(Path.DirectorySeparatorChar, Path.AltDirectorySeparatorChar)) };
-        foreach (var (depth, dir, file) in TreeWalk(root))
+        var listing = new DirListing(new(), new());
+        try
+        {
+            var entries = new FileSystemEnumerable<(string path, string name, long size, bool isDir)>(
+                dir,
+                (ref FileSystemEntry e) => (e.ToFullPath(), e.FileName.ToString(), e.IsDirectory ? 0 : e.Length, e.IsDirectory),
+                ScanOptions);
+            foreach (var (path, name, size, isDir) in entries)
+            {
+                if (!isDir) listing.Files.Add((path, name, size));
+                else if (!IgnoreDirs.Contains(name)) listing.Dirs.Add((path, name));
+            }
+        }
+        catch
         {
-            if (dir != null) lines.Add(new string(' ', Math.Max(0, (depth - 1) * 4)) + "└── " + Path.GetFileName(dir));
-            if (file != null) lines.Add(new string(' ', depth * 4) + "├── " + Path.GetFileName(file));
+            // Unreadable directory: keep whatever was listed before the failure
         }
-        var manifest = new { id = "__TREE__", type = "tree", path = "__TREE__", root, text = string.Join('\n', lines) };
-        w.WriteLine(JsonSerializer.Serialize(manifest));
+        return listing;
     }
 
-    static IEnumerable<(int depth, string? dir, string? file)> TreeWalk(string root)
+    [MethodImpl(MethodImplOptions.AggressiveInlining)]
+    static bool IsAllowedFile(string name)
     {
-        var stack = new Stack<(string path, int depth)>();
-        stack.Push((root, 0));
-        while (stack.Count > 0)
-        {
-            var (cur, depth) = stack.Pop();
-            IEnumerable<string> dirs;
-            try { dirs = Directory.EnumerateDirectories(cur); } catch { dirs = Array.Empty<string>(); }
-            IEnumerable<string> files;
-            try { files = Directory.EnumerateFiles(cur); } catch { files = Array.Empty<string>(); }
-
-            if (depth > 0) yield return (depth, cur, null);
-            foreach (var f in files) yield return (depth, null, f);
+        if (SpecialBasenames.ContainsKey(name)) return true;
+        var dot = name.LastIndexOf('.');
+        return dot >= 0 && AllowedExtKeys.Contains(PackExtension(name.AsSpan(dot + 1)));
+    }
 
-            foreach (var d in dirs.Where(d => !IgnoreDirs.Contains(Path.GetFileName(d))).OrderByDescending(s => s, StringComparer.Ordinal))
-                stack.Push((d, depth + 1));
+    // The ASCII-lowercased characters of an extension (without the dot), one byte each. A UInt128
+    // holds up to 16; the longest allowed extension ("properties") has 10. Anything longer than
+    // 16, empty or non-ASCII packs to 0, which no allowed extension does.
+    static UInt128 PackExtension(ReadOnlySpan<char> ext)
+    {
+        if (ext.Length is 0 or > 16) return 0;
+        UInt128 key = 0;
+        foreach (var ch in ext)
+        {
+            if (ch > 0x7F) return 0;
+            key = (key << 8) | (byte)(char.IsAsciiLetterUpper(ch) ? ch | 0x20 : ch);
         }
+        return key;
     }
 
-    IEnumerable<string> ProcessFile(string root, string file)
+    static void WriteJsonLine(Stream w, ReadOnlySpan<byte> json)
     {
-        if (!IsAllowedFile(file)) yield break;
+        w.Write(json);
+        w.WriteByte((byte)'\n');
+    }
 
-        var text = ReadTextFile(file, _opts.MaxBytes);
-        if (text == null) yield break;
+    static void WriteTreeManifest(Stream w, string root, List<string> lines)
+    {
+        var manifest = new { id = "__TREE__", type = "tree", path = "__TREE__", root, text = string.Join('\n', lines) };
+        WriteJsonLine(w, JsonSerializer.SerializeToUtf8Bytes(manifest));
+    }
+
+    // Records are serialized straight to UTF-8; the writer copies the bytes without a string round-trip.
+    // `file` is already a full path from the scan and `rel` its slice below root.
+    // All records of one file (file, classes, functions) are encoded as newline-terminated JSON
+    // into the thread's reusable buffer, and the writer gets them back as a single chunk.
+    byte[] ProcessFile(string root, string file, string rel, long size)
+    {
+        var text = ReadTextFile(file, size, _opts.MaxBytes);
+        if (text == null) return Array.Empty<byte>();
 
         var lang = DetectLang(file);
-        var rel = Path.GetRelativePath(root, file);
-        var abs = Path.GetFullPath(file);
-        var contentWithCtx = BuildTextWithContext(root, rel, abs, lang, text.Value.Content);
+        var abs = file;
+        var relPath = rel.Replace('\\', '/');
+        var content = text.Value.Content;
 
-        var fileObj = new JsonObj
-        {
-            id = BuildIdForFile(rel),
-            type = "file",
-            title = ExtractionTools.HeuristicFileTitle(rel, lang, text.Value.Content),
-            path = rel.Replace('\\','/'),
-            abs_path = abs,
-            root = root,
-            lang = lang,
-            size = text.Value.Size,
-            hash = ExtractionTools.Sha256(text.Value.Content),
-            text = contentWithCtx
-        };
-        yield return JsonSerializer.Serialize(fileObj);
+        var buffer = t_recordBuffer ??= new ArrayBufferWriter<byte>(64 * 1024);
+        buffer.ResetWrittenCount();
+        var json = t_recordWriter ??= new Utf8JsonWriter(buffer);
+        json.Reset(buffer);
+
+        WriteRecord(json, buffer, BuildIdForFile(rel), "file", ExtractionTools.HeuristicFileTitle(rel, lang, content), null, null,
+            relPath, abs, root, lang, text.Value.Size, text.Value.Hash, BuildTextWithContext(root, rel, abs, lang, content));
 
         // Extract classes (for object-oriented languages)
-        foreach (var cls in ExtractionTools.ExtractClasses(rel, lang, text.Value.Content))
+        foreach (var cls in ExtractionTools.ExtractClasses(rel, lang, content))
         {
-            var clsObj = new JsonObj
-            {
-                id = BuildIdForClass(rel, cls.name),
-                type = "class",
-                title = ExtractionTools.HeuristicClassTitle(cls.name, rel, lang, cls.body),
-                class_name = cls.name,
-                path = rel.Replace('\\','/'),
-                abs_path = abs,
-                root = root,
-                lang = lang,
-                size = cls.body.Length,
-                hash = ExtractionTools.Sha256(cls.body),
-                text = BuildTextWithContext(root, rel, abs, lang, cls.body)
-            };
-            yield return JsonSerializer.Serialize(clsObj);
+            WriteRecord(json, buffer, BuildIdForClass(rel, cls.name), "class", ExtractionTools.HeuristicClassTitle(cls.name, rel, lang, cls.body), cls.name, null,
+                relPath, abs, root, lang, cls.body.Length, ExtractionTools.Sha256(cls.body), BuildTextWithContext(root, rel, abs, lang, cls.body));
         }
 
         // Extract functions/methods
-        foreach (var fn in ExtractionTools.ExtractFunctions(rel, lang, text.Value.Content))
+        foreach (var fn in ExtractionTools.ExtractFunctions(rel, lang, content))
         {
-            var fnObj = new JsonObj
-            {
-                id = BuildIdForFunction(rel, fn.name),
-                type = "function",
-                title = ExtractionTools.HeuristicFunctionTitle(fn.name, rel, lang, fn.body),
-                function = fn.name,
-                path = rel.Replace('\\','/'),
-                abs_path = abs,
-                root = root,
-                lang = lang,
-                size = fn.body.Length,
-                hash = ExtractionTools.Sha256(fn.body),
-                text = BuildTextWithContext(root, rel, abs, lang, fn.body)
-            };
-            yield return JsonSerializer.Serialize(fnObj);
+            WriteRecord(json, buffer, BuildIdForFunction(rel, fn.name), "function", ExtractionTools.HeuristicFunctionTitle(fn.name, rel, lang, fn.body), null, fn.name,
+                relPath, abs, root, lang, fn.body.Length, ExtractionTools.Sha256(fn.body), BuildTextWithContext(root, rel, abs, lang, fn.body));
         }
+
+        return buffer.WrittenSpan.ToArray();
+    }
+
+    [ThreadStatic] static ArrayBufferWriter<byte>? t_recordBuffer;
+    [ThreadStatic] static Utf8JsonWriter? t_recordWriter;
+
+    static readonly JsonEncodedText IdProp = JsonEncodedText.Encode("id");
+    static readonly JsonEncodedText TypeProp = JsonEncodedText.Encode("type");
+    static readonly JsonEncodedText TitleProp = JsonEncodedText.Encode("title");
+    static readonly JsonEncodedText ClassNameProp = JsonEncodedText.Encode("class_name");
+    static readonly JsonEncodedText FunctionProp = JsonEncodedText.Encode("function");
+    static readonly JsonEncodedText PathProp = JsonEncodedText.Encode("path");
+    static readonly JsonEncodedText AbsPathProp = JsonEncodedText.Encode("abs_path");
+    static readonly JsonEncodedText RootProp = JsonEncodedText.Encode("root");
+    static readonly JsonEncodedText LangProp = JsonEncodedText.Encode("lang");
+    static readonly JsonEncodedText SizeProp = JsonEncodedText.Encode("size");
+    static readonly JsonEncodedText HashProp = JsonEncodedText.Encode("hash");
+    static readonly JsonEncodedText TextProp = JsonEncodedText.Encode("text");
+
+    // Hand-written record layout (same field order and escaping as serializing the old JsonObj
+    // type): no reflection, no per-record object, and the property names are pre-encoded.
+    static void WriteRecord(Utf8JsonWriter json, ArrayBufferWriter<byte> buffer, string id, string type, string? title, string? className, string? function,
+        string path, string abs, string root, string lang, int size, string hash, string text)
+    {
+        json.WriteStartObject();
+        json.WriteString(IdProp, id);
+        json.WriteString(TypeProp, type);
+        json.WriteString(TitleProp, title);
+        json.WriteString(ClassNameProp, className);
+        json.WriteString(FunctionProp, function);
+        json.WriteString(PathProp, path);
+        json.WriteString(AbsPathProp, abs);
+        json.WriteString(RootProp, root);
+        json.WriteString(LangProp, lang);
+        json.WriteNumber(SizeProp, size);
+        json.WriteString(HashProp, hash);
+        json.WriteString(TextProp, text);
+        json.WriteEndObject();
+        json.Flush();
+        buffer.GetSpan(1)[0] = (byte)'\n';
+        buffer.Advance(1);
+        json.Reset(buffer);
     }
 
-    sealed class JsonObj
+    // Only the fields needed to diff against the previous corpus; the rest of the line is skipped.
+    sealed class CorpusKey
     {
-        public string id { get; set; } = "";
-        public string type { get; set; } = "";
-        public string? title { get; set; }
-        public string? class_name { get; set; }
-        public string? function { get; set; }
-        public string path { get; set; } = "";
-        public string abs_path { get; set; } = "";
-        public string root { get; set; } = "";
-        public string lang { get; set; } = "";
-        public int size { get; set; }
-        public string hash { get; set; } = "";
-        public string text { get; set; } = "";
+        public string? id { get; set; }
+        public string? hash { get; set; }
     }
 }
\ No newline at end of file
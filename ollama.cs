@@ -0,0 +1,17 @@
+// ollama.cs (library component)
+using System;
+using System.Net.Http;
+
+namespace OllamaHttpLib;
+
+// One connection pool for every Ollama client in the process, RAG runtime and chat alike, so
+// repeated requests reuse the open keep-alive connection instead of paying TCP setup each time.
+// Clients wrap it with disposeHandler: false.
+internal static class OllamaHttp
+{
+    internal static readonly SocketsHttpHandler SharedHandler = new()
+    {
+        MaxConnectionsPerServer = 4,
+        PooledConnectionLifetime = TimeSpan.FromMinutes(10),
+    };
+}
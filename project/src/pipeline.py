@@ -1,8 +1,9 @@
 import argparse
 txt = read_text(path) if embed_text else None
+ap = os.path.abspath(path)
 return Record(
-path=os.path.abspath(path),
-rel=os.path.relpath(path, root),
+path=ap,
+rel=ap[rel_start:],
 size=int(st.st_size),
 mtime=float(st.st_mtime),
 sha256=sha256_of_file(path),
@@ -26,13 +27,10 @@ root = os.path.abspath(args.path)
 if not os.path.isdir(root):
 print("not a directory", file=sys.stderr)
 return 2
-recs: List[Record] = []
-for p, d in iter_files(root, args.depth):
-r = to_record(root, p, d, embed_text=not args.no_text)
-if r:
-recs.append(r)
+rel_start = len(root) if root.endswith(os.sep) else len(root) + 1
+recs = (to_record(root, p, d, embed_text=not args.no_text, rel_start=rel_start) for p, d in iter_files(root, args.depth))
 os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
-with open(args.out, "w", encoding="utf-8") as f:
+with open(args.out, "w", encoding="utf-8", buffering=1 << 20) as f:
 n = write_jsonl(recs, f)
 print(n)
 return 0
@@ -49,8 +47,9 @@ def cmd_tree(args: argparse.Namespace) -> int:
 root = os.path.abspath(args.path)
 width = args.width
 by_dir: Dict[str, List[str]] = {}
+rel_start = len(root) if root.endswith(os.sep) else len(root) + 1
 for p, d in iter_files(root, args.depth):
-rel = os.path.relpath(p, root)
+rel = os.path.abspath(p)[rel_start:]
 dirp = os.path.dirname(rel)
 by_dir.setdefault(dirp, []).append(os.path.basename(p))
 lines: List[str] = []
@@ -3,16 +3,19 @@ using System;
 using System.Buffers;
 using System.Collections.Concurrent;
 using System.Collections.Generic;
+using System.Diagnostics;
 using System.IO;
 using System.Linq;
 using System.Net.Http;
 using System.Net.Http.Json;
+using System.Runtime.InteropServices;
 using System.Text;
 using System.Text.Json;
 using System.Text.Json.Serialization;
 using System.Threading;
 using System.Threading.Channels;
 using System.Threading.Tasks;
+using OllamaHttpLib;
 
 namespace RagLib;
 
@@ -31,17 +34,27 @@ public sealed class RagRuntime : IAsyncDisposable
     readonly RagOptions _opts;
     readonly HttpClient _http;
     readonly List<string> _texts = new();
+    readonly HashSet<string> _seenHashes = new(StringComparer.Ordinal);
     readonly List<(int start, int length)> _docSpans = new();
     readonly List<SparseVec> _docVecs = new();
     readonly Dictionary<string, int> _vocab = new(StringComparer.OrdinalIgnoreCase);
     float[]? _idf;
+    int[] _postStart = Array.Empty<int>();
+    int[] _postDocs = Array.Empty<int>();
+    byte[] _postVals = Array.Empty<byte>();
+    float[] _postScale = Array.Empty<float>();
     int _tokenCount;
     bool _built;
+    // Length and mtime (ticks) of the corpus file the texts were loaded from; the index cache is
+    // stamped with these, not with whatever file sits at DataPath when it is saved
+    (long length, long ticks) _corpusStamp;
+
+    const int CorpusBufferSize = 1 << 20;
 
     public RagRuntime(RagOptions opts)
     {
         _opts = opts;
-        _http = new HttpClient { Timeout = TimeSpan.FromMinutes(5) };
+        _http = new HttpClient(OllamaHttp.SharedHandler, disposeHandler: false) { Timeout = TimeSpan.FromMinutes(5) };
     }
 
     public IReadOnlyList<string> Texts => _texts;
@@ -50,18 +63,71 @@ public sealed class RagRuntime : IAsyncDisposable
     {
         if (!File.Exists(_opts.DataPath)) throw new FileNotFoundException(_opts.DataPath);
         _texts.Clear();
-        using var fs = File.OpenRead(_opts.DataPath);
-        using var sr = new StreamReader(fs, new UTF8Encoding(false));
-        string? line;
-        while ((line = sr.ReadLine()) != null)
+        _seenHashes.Clear();
+        // Split lines on raw bytes and hand each UTF-8 slice to the deserializer, so no line is
+        // ever decoded to a string; only the "hash" and "text" values are materialized.
+        using var fs = new FileStream(_opts.DataPath, FileMode.Open, FileAccess.Read, FileShare.Read, 1, FileOptions.SequentialScan);
+        _corpusStamp = (fs.Length, File.GetLastWriteTimeUtc(fs.SafeFileHandle).Ticks);
+        var buf = ArrayPool<byte>.Shared.Rent(CorpusBufferSize);
+        try
         {
-            ct.ThrowIfCancellationRequested();
-            if (line.Length == 0) continue;
-            using var jd = JsonDocument.Parse(line);
-            if (!jd.RootElement.TryGetProperty("text", out var te)) continue;
-            var t = te.GetString() ?? "";
-            _texts.Add(t);
+            var filled = 0;
+            var first = true;
+            while (true)
+            {
+                if (filled == buf.Length)
+                {
+                    // A single line larger than the buffer: grow and keep reading
+                    var bigger = ArrayPool<byte>.Shared.Rent(buf.Length * 2);
+                    buf.AsSpan(0, filled).CopyTo(bigger);
+                    ArrayPool<byte>.Shared.Return(buf);
+                    buf = bigger;
+                }
+                var read = fs.Read(buf, filled, buf.Length - filled);
+                if (read == 0)
+                {
+                    AddCorpusLine(buf.AsSpan(0, filled), ct);
+                    break;
+                }
+                filled += read;
+
+                var span = buf.AsSpan(0, filled);
+                if (first && span.Length >= 3)
+                {
+                    if (span.StartsWith((ReadOnlySpan<byte>)[0xEF, 0xBB, 0xBF])) span[..3].Fill((byte)' ');
+                    first = false;
+                }
+                var consumed = 0;
+                int nl;
+                while ((nl = span[consumed..].IndexOf((byte)'\n')) >= 0)
+                {
+                    AddCorpusLine(span.Slice(consumed, nl), ct);
+                    consumed += nl + 1;
+                }
+                span[consumed..].CopyTo(buf);
+                filled -= consumed;
+            }
         }
+        finally
+        {
+            ArrayPool<byte>.Shared.Return(buf);
+        }
+    }
+
+    void AddCorpusLine(ReadOnlySpan<byte> line, CancellationToken ct)
+    {
+        ct.ThrowIfCancellationRequested();
+        line = line.TrimEnd((byte)'\r');
+        if (line.IsEmpty) return;
+        var entry = JsonSerializer.Deserialize<CorpusEntry>(line);
+        if (entry?.text is not string t) return;
+        // Exact duplicates (vendored copies, repeated boilerplate) carry the same content hash
+        // from the extractor; only the first one is indexed. _seenHashes holds file hashes (of the
+        // raw bytes) and class/function hashes (of the body's UTF-8) alike, so a class spanning a
+        // whole BOM-less UTF-8 file shares its file's hash and is dropped in favour of the file
+        // entry; that is intended, the file entry already carries the same code.
+        if (entry.hash is string h && !_seenHashes.Add(h)) return;
+        _texts.Add(t);
     }
 
     public void BuildIndex(CancellationToken ct = default)
@@ -140,11 +206,12 @@ public sealed class RagRuntime : IAsyncDisposable
 
             _idf = new float[_vocab.Count];
             var dfCounts = new int[_vocab.Count];
+            var seen = new HashSet<int>();
             for (int d = 0; d < _texts.Count; d++)
             {
                 ct.ThrowIfCancellationRequested();
                 var (s, l) = offsets[d];
-                var seen = new HashSet<int>();
+                seen.Clear();
                 for (int k = 0; k < l; k++)
                 {
                     var id = remappedTokens[s + k];
@@ -158,32 +225,25 @@ public sealed class RagRuntime : IAsyncDisposable
                 _idf[t] = MathF.Log((N + 1f) / (dfv + 0.5f)) + 1f;
             }
 
-            _docVecs.Capacity = _texts.Count;
-            for (int d = 0; d < _texts.Count; d++)
-            {
-                ct.ThrowIfCancellationRequested();
-                var (s, l) = offsets[d];
-                if (l == 0) { _docVecs.Add(new SparseVec(Array.Empty<int>(), Array.Empty<float>(), 0f)); continue; }
-                var counts = new Dictionary<int, int>();
-                for (int k = 0; k < l; k++)
-                {
-                    var id = remappedTokens[s + k];
-                    counts[id] = counts.TryGetValue(id, out var c) ? c + 1 : 1;
-                }
-                var idx = counts.Keys.OrderBy(x => x).ToArray();
-                var vals = new float[idx.Length];
-                float norm = 0f;
-                for (int i = 0; i < idx.Length; i++)
+            // Encode documents in fixed-size batches across the index threads. Each worker reuses
+            // one count table and writes its vectors straight into their slots.
+            var idf = _idf;
+            var vecs = new SparseVec[_texts.Count];
+            Parallel.ForEach(
+                Partitioner.Create(0, _texts.Count, EncodeBatchSize),
+                new ParallelOptions { MaxDegreeOfParallelism = threads, CancellationToken = ct },
+                () => new Dictionary<int, int>(),
+                (range, _, counts) =>
                 {
-                    var tf = counts[idx[i]];
-                    var w = (1f + MathF.Log(tf)) * _idf[idx[i]];
-                    vals[i] = w;
-                    norm += w * w;
-                }
-                norm = MathF.Sqrt(norm) + 1e-8f;
-                for (int i = 0; i < vals.Length; i++) vals[i] /= norm;
-                _docVecs.Add(new SparseVec(idx, vals, norm));
-            }
+                    for (int d = range.Item1; d < range.Item2; d++)
+                    {
+                        ct.ThrowIfCancellationRequested();
+                        vecs[d] = EncodeDoc(remappedTokens, offsets[d], idf, counts);
+                    }
+                    return counts;
+                },
+                _ => { });
+            _docVecs.AddRange(vecs);
         }
         finally
         {
@@ -197,22 +257,181 @@ public sealed class RagRuntime : IAsyncDisposable
             _docSpans.Add((offsets[i].start, offsets[i].len));
             acc += offsets[i].len;
         }
+        (_postStart, _postDocs, _postVals, _postScale) = BuildPostings(_docVecs, _vocab.Count);
         _built = true;
     }
 
+    // Sidecar cache of the built index, keyed on the corpus file's length and mtime
+    string IndexPath => _opts.DataPath + ".index";
+    const long IndexMagic = 0x3258444947415232; // "2RAGIDX2"
+
+    /// <summary>
+    /// Writes the built index next to the corpus so later runs can skip LoadCorpus/BuildIndex.
+    /// </summary>
+    public void SaveIndex(CancellationToken ct = default)
+    {
+        if (!_built) throw new InvalidOperationException("Index not built");
+        var tmp = IndexPath + ".tmp";
+        try
+        {
+            using (var fs = new FileStream(tmp, FileMode.Create, FileAccess.Write, FileShare.None, CorpusBufferSize))
+            using (var bw = new BinaryWriter(fs, Encoding.UTF8))
+            {
+                bw.Write(IndexMagic);
+                bw.Write(_corpusStamp.length);
+                bw.Write(_corpusStamp.ticks);
+
+                bw.Write(_texts.Count);
+                foreach (var t in _texts) bw.Write(t);
+                bw.Write(_vocab.Count);
+                foreach (var (term, id) in _vocab)
+                {
+                    bw.Write(term);
+                    bw.Write(id);
+                }
+                WriteArray(bw, _idf!);
+                bw.Write(_tokenCount);
+                bw.Write(_docSpans.Count);
+                foreach (var (start, length) in _docSpans)
+                {
+                    bw.Write(start);
+                    bw.Write(length);
+                }
+                bw.Write(_docVecs.Count);
+                foreach (var v in _docVecs)
+                {
+                    ct.ThrowIfCancellationRequested();
+                    WriteArray(bw, v.Idx);
+                    WriteArray(bw, v.Val);
+                    bw.Write(v.Norm);
+                }
+            }
+            File.Move(tmp, IndexPath, overwrite: true);
+        }
+        catch
+        {
+            // Don't leave a partial cache behind; a directory in the way is left alone
+            try
+            {
+                if (File.Exists(tmp)) File.Delete(tmp);
+            }
+            catch (Exception ex) when (ex is IOException or UnauthorizedAccessException) { }
+            throw;
+        }
+    }
+
+    /// <summary>
+    /// Loads the index saved by <see cref="SaveIndex"/> if it was built from the current corpus file.
+    /// Returns false, leaving the runtime untouched, when there is no usable cache.
+    /// </summary>
+    public bool TryLoadIndex(CancellationToken ct = default)
+    {
+        if (!File.Exists(_opts.DataPath) || !File.Exists(IndexPath)) return false;
+        var corpus = new FileInfo(_opts.DataPath);
+        try
+        {
+            using var fs = new FileStream(IndexPath, FileMode.Open, FileAccess.Read, FileShare.Read, CorpusBufferSize, FileOptions.SequentialScan);
+            using var br = new BinaryReader(fs, Encoding.UTF8);
+            if (br.ReadInt64() != IndexMagic) return false;
+            var stamp = (length: br.ReadInt64(), ticks: br.ReadInt64());
+            if (stamp != (corpus.Length, corpus.LastWriteTimeUtc.Ticks)) return false;
+
+            var texts = new List<string>(br.ReadInt32());
+            for (int i = texts.Capacity; i > 0; i--) texts.Add(br.ReadString());
+            var vocabCount = br.ReadInt32();
+            var vocab = new Dictionary<string, int>(vocabCount, StringComparer.OrdinalIgnoreCase);
+            for (int i = 0; i < vocabCount; i++) vocab[br.ReadString()] = br.ReadInt32();
+            var idf = ReadArray<float>(br);
+            var tokenCount = br.ReadInt32();
+            var spans = new List<(int start, int length)>(br.ReadInt32());
+            for (int i = spans.Capacity; i > 0; i--) spans.Add((br.ReadInt32(), br.ReadInt32()));
+            var vecs = new List<SparseVec>(br.ReadInt32());
+            for (int i = vecs.Capacity; i > 0; i--)
+            {
+                ct.ThrowIfCancellationRequested();
+                vecs.Add(new SparseVec(ReadArray<int>(br), ReadArray<float>(br), br.ReadSingle()));
+            }
+            // Everything Retrieve indexes by must line up, or the cache is corrupt
+            if (vecs.Count != texts.Count || idf.Length != vocabCount || vocab.Count != vocabCount) return false;
+            foreach (var id in vocab.Values)
+            {
+                if ((uint)id >= (uint)vocabCount) return false;
+            }
+            // Throws on out-of-range term ids, before any state has been replaced
+            var postings = BuildPostings(vecs, vocabCount);
+
+            _texts.Clear(); _texts.AddRange(texts);
+            _vocab.Clear(); foreach (var kv in vocab) _vocab[kv.Key] = kv.Value;
+            _idf = idf;
+            _tokenCount = tokenCount;
+            _docSpans.Clear(); _docSpans.AddRange(spans);
+            _docVecs.Clear(); _docVecs.AddRange(vecs);
+            (_postStart, _postDocs, _postVals, _postScale) = postings;
+            _corpusStamp = stamp;
+            _built = true;
+            return true;
+        }
+        catch (Exception ex) when (ex is not OperationCanceledException)
+        {
+            // Truncated, corrupt or unreadable cache: fall back to a rebuild
+            return false;
+        }
+    }
+
+    static void WriteArray<T>(BinaryWriter bw, T[] values) where T : unmanaged
+    {
+        bw.Write(values.Length);
+        bw.Write(MemoryMarshal.AsBytes(values.AsSpan()));
+    }
+
+    static T[] ReadArray<T>(BinaryReader br) where T : unmanaged
+    {
+        var values = new T[br.ReadInt32()];
+        br.BaseStream.ReadExactly(MemoryMarshal.AsBytes(values.AsSpan()));
+        return values;
+    }
+
     public IReadOnlyList<(int index, float score, string text)> Retrieve(string query, int k = 3, CancellationToken ct = default)
     {
         if (!_built) throw new InvalidOperationException("Index not built");
         var q = ToSparse(query, ct);
-        var heap = new TopK(k);
-        for (int i = 0; i < _docVecs.Count; i++)
+        var n = _docVecs.Count;
+        var scores = ArrayPool<float>.Shared.Rent(n);
+        try
         {
-            ct.ThrowIfCancellationRequested();
-            var s = Cosine(q, _docVecs[i]);
-            heap.Add((i, s));
+            // Accumulate dot products over the query terms' postings only; every weight is
+            // positive, so a zero score means the document hasn't been touched yet.
+            Array.Clear(scores, 0, n);
+            var touched = new List<int>();
+            for (int i = 0; i < q.Idx.Length; i++)
+            {
+                ct.ThrowIfCancellationRequested();
+                var t = q.Idx[i];
+                var qv = q.Val[i] * _postScale[t];
+                for (int p = _postStart[t], end = _postStart[t + 1]; p < end; p++)
+                {
+                    var d = _postDocs[p];
+                    if (scores[d] == 0f) touched.Add(d);
+                    scores[d] += qv * _postVals[p];
+                }
+            }
+            touched.Sort();
+
+            var heap = new TopK(k);
+            foreach (var d in touched) heap.Add((d, scores[d]));
+            // Fewer matches than k: fill with zero-score documents in index order, as a full scan would
+            for (int d = 0, pad = k - touched.Count; pad > 0 && d < n; d++)
+            {
+                if (scores[d] != 0f) continue;
+                heap.Add((d, 0f));
+                pad--;
+            }
+            return heap.GetSorted().Select(t => (t.index, t.score, _texts[t.index])).ToList();
+        }
+        finally
+        {
+            ArrayPool<float>.Shared.Return(scores);
         }
-        var res = heap.GetSorted().Select(t => (t.index, t.score, _texts[t.index])).ToList();
-        return res;
     }
 
     public async IAsyncEnumerable<string> StreamGenerateAsync(string prompt, int? numPredict = null, string? model = null, [System.Runtime.CompilerServices.EnumeratorCancellation] CancellationToken ct = default)
@@ -227,28 +446,67 @@ public sealed class RagRuntime : IAsyncDisposable
         };
         using var httpReq = new HttpRequestMessage(HttpMethod.Post, url)
         {
-            Content = new StringContent(JsonSerializer.Serialize(req), Encoding.UTF8, "application/json")
+            Content = JsonContent.Create(req)
         };
         using var resp = await _http.SendAsync(httpReq, HttpCompletionOption.ResponseHeadersRead, ct);
         resp.EnsureSuccessStatusCode();
         using var stream = await resp.Content.ReadAsStreamAsync(ct);
-        using var sr = new StreamReader(stream, Encoding.UTF8);
-        string? line;
-        while ((line = await sr.ReadLineAsync()) != null)
+        // Split the NDJSON stream on raw bytes and deserialize each event from UTF-8 directly,
+        // skipping the StreamReader decode and the per-line string.
+        var buf = ArrayPool<byte>.Shared.Rent(16 * 1024);
+        try
         {
-            ct.ThrowIfCancellationRequested();
-            if (line.Length == 0) continue;
-            GenerateStreamEvent? ev = null;
-            try { ev = JsonSerializer.Deserialize<GenerateStreamEvent>(line); } catch { }
-            if (ev?.response is string chunk && chunk.Length > 0) yield return chunk;
-            if (ev?.done == true) yield break;
+            int filled = 0, searchFrom = 0;
+            while (true)
+            {
+                if (filled == buf.Length)
+                {
+                    var bigger = ArrayPool<byte>.Shared.Rent(buf.Length * 2);
+                    Buffer.BlockCopy(buf, 0, bigger, 0, filled);
+                    ArrayPool<byte>.Shared.Return(buf);
+                    buf = bigger;
+                }
+                var read = await stream.ReadAsync(buf.AsMemory(filled), ct);
+                if (read == 0)
+                {
+                    if (ParseStreamEvent(buf, 0, filled)?.response is string tail && tail.Length > 0) yield return tail;
+                    yield break;
+                }
+                filled += read;
+
+                int consumed = 0, nl;
+                while ((nl = Array.IndexOf(buf, (byte)'\n', searchFrom, filled - searchFrom)) >= 0)
+                {
+                    ct.ThrowIfCancellationRequested();
+                    var ev = ParseStreamEvent(buf, consumed, nl - consumed);
+                    consumed = searchFrom = nl + 1;
+                    if (ev?.response is string chunk && chunk.Length > 0) yield return chunk;
+                    if (ev?.done == true) yield break;
+                }
+                Buffer.BlockCopy(buf, consumed, buf, 0, filled - consumed);
+                filled -= consumed;
+                searchFrom = filled;
+            }
         }
+        finally
+        {
+            ArrayPool<byte>.Shared.Return(buf);
+        }
+    }
+
+    static GenerateStreamEvent? ParseStreamEvent(byte[] buf, int start, int length)
+    {
+        var line = buf.AsSpan(start, length).TrimEnd((byte)'\r');
+        if (line.IsEmpty) return null;
+        try { return JsonSerializer.Deserialize<GenerateStreamEvent>(line); } catch { return null; }
+
     }
 
     public async Task<string> GenerateToStringAsync(string prompt, Action<GenProgress>? onProgress = null, int? numPredict = null, string? model = null, CancellationToken ct = default)
     {
-        var start = DateTimeOffset.UtcNow;
-        var sb = new StringBuilder();
+        var start = Stopwatch.GetTimestamp();
+        // Pre-size for the expected answer (~4 chars/token) so appends rarely regrow the buffer
+        var sb = new StringBuilder(Math.Clamp((numPredict ?? _opts.NumPredict) * 4, 256, 1 << 20));
         int tokens = 0;
         await foreach (var chunk in StreamGenerateAsync(prompt, numPredict, model, ct))
         {
@@ -257,11 +515,86 @@ public sealed class RagRuntime : IAsyncDisposable
             onProgress?.Invoke(new GenProgress
             {
                 Tokens = tokens,
-                Elapsed = DateTimeOffset.UtcNow - start,
+                Elapsed = Stopwatch.GetElapsedTime(start),
                 Fraction = numPredict.HasValue && numPredict.Value > 0 ? Math.Clamp(tokens / (float)numPredict.Value, 0f, 1f) : null
             });
         }
-        return sb.ToString().Trim();
+        return ToTrimmedString(sb);
+    }
+
+    // Equivalent to sb.ToString().Trim() without materializing the untrimmed copy first
+    static string ToTrimmedString(StringBuilder sb)
+    {
+        int s = 0, e = sb.Length;
+        while (s < e && char.IsWhiteSpace(sb[s])) s++;
+        while (e > s && char.IsWhiteSpace(sb[e - 1])) e--;
+        return sb.ToString(s, e - s);
+    }
+
+    const int EncodeBatchSize = 256;
+
+    static SparseVec EncodeDoc(int[] tokens, (int start, int len) span, float[] idf, Dictionary<int, int> counts)
+    {
+        var (s, l) = span;
+        if (l == 0) return new SparseVec(Array.Empty<int>(), Array.Empty<float>(), 0f);
+        counts.Clear();
+        for (int k = 0; k < l; k++)
+        {
+            CollectionsMarshal.GetValueRefOrAddDefault(counts, tokens[s + k], out _)++;
+        }
+        var idx = new int[counts.Count];
+        counts.Keys.CopyTo(idx, 0);
+        Array.Sort(idx);
+        var vals = new float[idx.Length];
+        float norm = 0f;
+        for (int i = 0; i < idx.Length; i++)
+        {
+            var tf = counts[idx[i]];
+            var w = (1f + MathF.Log(tf)) * idf[idx[i]];
+            vals[i] = w;
+            norm += w * w;
+        }
+        norm = MathF.Sqrt(norm) + 1e-8f;
+        for (int i = 0; i < vals.Length; i++) vals[i] /= norm;
+        return new SparseVec(idx, vals, norm);
+    }
+
+    // Term -> (doc, weight) postings in CSR layout: the postings of term t live in
+    // [_postStart[t], _postStart[t + 1]), in ascending document order. Weights are stored as
+    // one byte each, scaled per term so that the term's largest weight maps to 255; a weight
+    // is recovered as _postVals[p] * _postScale[t].
+    static (int[] starts, int[] docs, byte[] vals, float[] scale) BuildPostings(List<SparseVec> docVecs, int termCount)
+    {
+        var starts = new int[termCount + 1];
+        foreach (var v in docVecs)
+        {
+            foreach (var t in v.Idx) starts[t + 1]++;
+        }
+        for (int t = 0; t < termCount; t++) starts[t + 1] += starts[t];
+
+        var scale = new float[termCount];
+        foreach (var v in docVecs)
+        {
+            for (int i = 0; i < v.Idx.Length; i++) scale[v.Idx[i]] = MathF.Max(scale[v.Idx[i]], v.Val[i]);
+        }
+        for (int t = 0; t < scale.Length; t++) scale[t] /= byte.MaxValue;
+
+        var docs = new int[starts[^1]];
+        var vals = new byte[docs.Length];
+        var cursor = (int[])starts.Clone();
+        for (int d = 0; d < docVecs.Count; d++)
+        {
+            var v = docVecs[d];
+            for (int i = 0; i < v.Idx.Length; i++)
+            {
+                var t = v.Idx[i];
+                var p = cursor[t]++;
+                docs[p] = d;
+                // Never round a posting down to 0: Retrieve treats a zero score as untouched
+                vals[p] = (byte)Math.Clamp(MathF.Round(v.Val[i] / scale[t]), 1f, byte.MaxValue);
+            }
+        }
+        return (starts, docs, vals, scale);
     }
 
     SparseVec ToSparse(string text, CancellationToken ct)
@@ -288,22 +621,6 @@ public sealed class RagRuntime : IAsyncDisposable
         return new SparseVec(idx, vals, norm);
     }
 
-    static float Cosine(in SparseVec a, in SparseVec b)
-    {
-        float s = 0f;
-        int i = 0, j = 0;
-        var ia = a.Idx; var va = a.Val;
-        var ib = b.Idx; var vb = b.Val;
-        while (i < ia.Length && j < ib.Length)
-        {
-            var da = ia[i]; var db = ib[j];
-            if (da == db) { s += va[i] * vb[j]; i++; j++; }
-            else if (da < db) i++;
-            else j++;
-        }
-        return s;
-    }
-
     static IEnumerable<string> Tokenize(string text)
     {
         var sb = new StringBuilder();
@@ -354,6 +671,13 @@ public sealed class RagRuntime : IAsyncDisposable
         public GenerateOptions options { get; set; } = new();
     }
 
+    // Only "hash" and "text" are bound; every other corpus field is skipped by the deserializer.
+    sealed class CorpusEntry
+    {
+        public string? hash { get; set; }
+        public string? text { get; set; }
+    }
+
     sealed class GenerateStreamEvent
     {
         public string? response { get; set; }